@@ -1,17 +1,29 @@
 """
-Factory that configures flywheel DynamoDB ORM-like framework.
+Factories that configure flywheel DynamoDB ORM-like framework (and plain boto3 access).
 
 """
 from os import environ
 
+from boto3.session import Session
+from botocore.config import Config
+from botocore.session import get_session
 from flywheel import Engine
 
-from microcosm.api import defaults
+from microcosm.api import defaults, typed
+from microcosm.config.types import boolean
 
 
 @defaults(
     namespace="",
     region=environ.get("AWS_DEFAULT_REGION"),
+    max_pool_connections=typed(int, default_value=10),
+    retries_mode="adaptive",
+    tcp_keepalive=typed(boolean, default_value=True),
+    host=None,
+    port=typed(int, default_value=8000),
+    # plain HTTP suits DynamoDB Local; enable for any other (remote) host
+    is_secure=typed(boolean, default_value=False),
+    dax_endpoint=None,
 )
 def configure_flywheel_engine(graph):
     """
@@ -23,8 +35,68 @@ def configure_flywheel_engine(graph):
     if graph.metadata.testing:
         from microcosm_dynamodb.mockengine import MockEngine
         engine = MockEngine(namespace="test-")
-    else:
-        engine = Engine(namespace=namespace)
+        engine.connect_to_region(graph.config.dynamodb.region)
+        return engine
 
-    engine.connect_to_region(graph.config.dynamodb.region)
+    engine = Engine(namespace=namespace)
+    host = graph.config.dynamodb.host
+    if host:
+        # connect to a specific (e.g. DynamoDB Local) endpoint instead of resolving one for the region
+        engine.connect(
+            graph.config.dynamodb.region,
+            session=make_session(graph),
+            host=host,
+            port=graph.config.dynamodb.port,
+            is_secure=graph.config.dynamodb.is_secure,
+        )
+    else:
+        engine.connect_to_region(graph.config.dynamodb.region, session=make_session(graph))
     return engine
+
+
+def configure_dynamodb_resource(graph):
+    """
+    Create a boto3 DynamoDB resource, sharing the engine's client configuration.
+
+    Useful for hot paths that do not need flywheel's model layer (e.g. `batch_writer()`).
+
+    Unlike the engine, the resource is not mocked when testing: it always talks to DynamoDB
+    (or to the configured host).
+
+    If a DAX endpoint is configured, reads and writes go through the DAX cluster instead
+    (requires the `dax` extra).
+
+    """
+    if graph.config.dynamodb.dax_endpoint:
+        from amazondax import AmazonDaxClient
+        return AmazonDaxClient.resource(
+            endpoint_url=graph.config.dynamodb.dax_endpoint,
+            region_name=graph.config.dynamodb.region,
+        )
+
+    host = graph.config.dynamodb.host
+    if host:
+        scheme = "https" if graph.config.dynamodb.is_secure else "http"
+        endpoint_url = "{}://{}:{}".format(scheme, host, graph.config.dynamodb.port)
+    else:
+        endpoint_url = None
+
+    return Session(botocore_session=make_session(graph)).resource(
+        "dynamodb",
+        region_name=graph.config.dynamodb.region,
+        endpoint_url=endpoint_url,
+    )
+
+
+def make_session(graph):
+    """
+    Create a botocore session whose clients pool and keep alive their connections.
+
+    """
+    session = get_session()
+    session.set_default_client_config(Config(
+        max_pool_connections=graph.config.dynamodb.max_pool_connections,
+        retries=dict(mode=graph.config.dynamodb.retries_mode),
+        tcp_keepalive=graph.config.dynamodb.tcp_keepalive,
+    ))
+    return session
@@ -3,17 +3,33 @@ Microcosm compatible configuration loader using DynamoDB.
 
 """
 from abc import ABCMeta, abstractmethod, abstractproperty
+from asyncio import get_running_loop
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from getpass import getuser
+from threading import RLock
+from time import monotonic, sleep
 from warnings import warn
 
+from botocore.config import Config
+from botocore.endpoint import MAX_POOL_CONNECTIONS
 from botocore.exceptions import ClientError
 from boto3 import Session
-from boto3.dynamodb.conditions import Attr
+from boto3.dynamodb.types import TypeDeserializer
 from credstash import paddedInt
 
 from microcosm.loaders import expand_config
 
 
+# DynamoDB's limit on the number of keys per BatchGetItem request
+BATCH_GET_SIZE = 100
+
+# BatchGetItem requests (per batch) before giving up on unprocessed keys, and the initial
+# (exponentially increasing) delay in seconds before resending them
+BATCH_GET_ATTEMPTS = 5
+BATCH_GET_BACKOFF = 0.05
+
+
 def table_name(prefix, service):
     """
     Generate the table name for a given service.
@@ -31,13 +47,22 @@ class DynamoDBLoader:
     """
     __metaclass__ = ABCMeta
 
+    # scans use the low-level client; deserializing its typed attributes is stateless
+    deserializer = TypeDeserializer()
+
     def __init__(self,
                  prefix=None,
                  separator="__",
                  profile_name=None,
-                 region=None):
+                 region=None,
+                 cache_ttl=60,
+                 consistent_read=False,
+                 segments=1):
         """
         :param prefix: table name prefix
+        :param cache_ttl: seconds to reuse loaded configuration for; disabled if falsey
+        :param consistent_read: whether to use (slower, more expensive) strongly consistent reads
+        :param segments: number of parallel scan segments; useful for services with many keys
 
         """
         # default to user-specific name for safety
@@ -45,6 +70,26 @@ class DynamoDBLoader:
         self.separator = separator
         self.profile_name = profile_name
         self.region = region
+        self.cache_ttl = cache_ttl
+        self.consistent_read = consistent_read
+        self.segments = segments
+        # the value type is fixed; precompute what each row and query needs from it
+        self._value_fields = self.value_type._fields
+        self._projection, self._attribute_names = self._projection_expression()
+        self._scan_kwargs = dict(
+            Select="SPECIFIC_ATTRIBUTES",
+            ProjectionExpression=self._projection,
+            ExpressionAttributeNames=self._attribute_names,
+        )
+        # loaded items by (service, version), along with their expiration time
+        self._cache = {}
+        # boto3 sessions and resources are expensive to create; build them lazily, once
+        # (sessions are not thread-safe, so creation is serialized for concurrent loads)
+        self._lock = RLock()
+        self._session = None
+        self._dynamodb = None
+        self._client = None
+        self._tables = {}
 
     def __call__(self, metadata, version=None):
         """
@@ -53,10 +98,50 @@ class DynamoDBLoader:
         """
         service = metadata if isinstance(metadata, str) else metadata.name
         return expand_config(
-            dict(self.items(service, version=version)),
+            dict(self.cached_items(service, version=version)),
             separator=self.separator,
         )
 
+    async def acall(self, metadata, **kwargs):
+        """
+        Build configuration from metadata without blocking the event loop.
+
+        Loading runs on the loop's default executor; KMS and DynamoDB requests are already
+        made concurrently (where possible) by the loader itself.
+
+        """
+        return await get_running_loop().run_in_executor(None, partial(self, metadata, **kwargs))
+
+    def cached_items(self, service, version=None):
+        """
+        Return configuration items, reusing items loaded within the last `cache_ttl` seconds.
+
+        """
+        if not self.cache_ttl:
+            return self.items(service, version)
+
+        now = monotonic()
+        expires_at, items = self._cache.get((service, version), (now, None))
+        if expires_at > now:
+            return items
+
+        items = list(self.items(service, version))
+        self._cache[(service, version)] = (now + self.cache_ttl, items)
+        return items
+
+    def refresh(self, service=None):
+        """
+        Invalidate cached configuration for a service (or for all services).
+
+        """
+        if service is None:
+            self._cache.clear()
+            return
+
+        for key in list(self._cache):
+            if key[0] == service:
+                del self._cache[key]
+
     @abstractproperty
     def value_type(self):
         """
@@ -86,36 +171,25 @@ class DynamoDBLoader:
 
     def all(self, service, version=None):
         """
-        Query all service config rows.
+        Generate all service config rows, one scan page at a time.
 
         """
-        # request all fields; since `key` is reserved, we have to use a substitution
-        field_names = [
-            "#k" if field == "key" else field
-            for field in self.value_type._fields
-        ]
-
-        attribute_names = {
-            "#n": "name",
-        }
-
-        if "#k" in field_names:
-            attribute_names["#k"] = "key"
+        scan_kwargs = dict(
+            self._scan_kwargs,
+            TableName=table_name(self.prefix, service),
+            ConsistentRead=self.consistent_read,
+        )
 
-        # filter by version, if any
+        # filter by version, if any; DynamoDB rejects an empty (`None`) filter expression
         if version is not None:
-            filter_expression = Attr("version").eq(version)
-        else:
-            filter_expression = None
+            scan_kwargs.update(
+                FilterExpression="#v = :v",
+                ExpressionAttributeNames=dict(self._attribute_names, **{"#v": "version"}),
+                ExpressionAttributeValues={":v": dict(S=version)},
+            )
 
         try:
-            return self._table(service).scan(
-                Select="SPECIFIC_ATTRIBUTES",
-                ProjectionExpression=", ".join(["#n"] + field_names),
-                FilterExpression=filter_expression,
-                ConsistentRead=True,
-                ExpressionAttributeNames=attribute_names,
-            )
+            yield from self._scan(**scan_kwargs)
         except ClientError as error:
             # we probably don't have logging configured yet, so use `warnings`
             warn(
@@ -126,33 +200,110 @@ class DynamoDBLoader:
             )
             raise
 
+    def _scan(self, **kwargs):
+        """
+        Scan a table, splitting the scan into parallel segments if configured.
+
+        """
+        # resolve the client once, on the calling thread, rather than in every segment worker
+        client = self.client
+
+        if self.segments <= 1:
+            yield from self._paginate(client, **kwargs)
+            return
+
+        with ThreadPoolExecutor(max_workers=self.segments) as executor:
+            segments = executor.map(
+                lambda segment: list(self._paginate(
+                    client,
+                    Segment=segment,
+                    TotalSegments=self.segments,
+                    **kwargs
+                )),
+                range(self.segments),
+            )
+            for rows in segments:
+                yield from rows
+
+    def _paginate(self, client, **kwargs):
+        """
+        Generate the (deserialized) rows of every page of a scan.
+
+        """
+        deserialize = self.deserializer.deserialize
+        while True:
+            response = client.scan(**kwargs)
+            for item in response["Items"]:
+                yield {
+                    name: deserialize(value)
+                    for name, value in item.items()
+                }
+
+            if "LastEvaluatedKey" not in response:
+                return
+            kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
     def items(self, service, version=None):
         """
         Generate configuration key rows as items.
 
         """
-        return [
-            (row["name"], self.decode(self.value_type(**{
-                name: value
-                for name, value in row.items()
-                if name not in ("name", "version")
-            })))
-            for row in self.all(service, version)["Items"]
-        ]
+        return self.decode_items(self.values(service, version))
+
+    def decode_items(self, values):
+        """
+        Generate items from (name, value type) pairs.
+
+        Subclasses may override to decode many values at once.
+
+        """
+        for name, value in values:
+            yield name, self.decode(value)
+
+    def encode_many(self, values):
+        """
+        Convert many plaintext values to value types.
+
+        Subclasses may override to encode many values at once.
+
+        """
+        return [self.encode(value) for value in values]
+
+    def values(self, service, version=None):
+        """
+        Generate configuration key rows as (encoded) value types.
+
+        """
+        for row in self.all(service, version):
+            yield row["name"], self._make_value(row)
 
     def put(self, service, name, value, version=None):
         """
         Put a configuration value.
 
         """
-        item = dict(
-            name=name,
-            version=version or paddedInt(1),
-        )
-        item.update(self.encode(value)._asdict())
         self._table(service).put_item(
-            Item=item,
+            Item=self._make_item(name, self.encode(value), version),
         )
+        self.refresh(service)
+
+    def put_many(self, service, items, version=None):
+        """
+        Put many configuration values using batched writes.
+
+        :param items: an iterable of (name, value) pairs
+
+        """
+        items = list(items)
+        encoded_values = self.encode_many([value for _, value in items])
+
+        # the batch writer sends up to 25 items per request and resends unprocessed items
+        with self._table(service).batch_writer() as batch:
+            for (name, _), encoded_value in zip(items, encoded_values):
+                batch.put_item(
+                    Item=self._make_item(name, encoded_value, version),
+                )
+        self.refresh(service)
 
     def get(self, service, name, version=None):
         """
@@ -170,11 +321,55 @@ class DynamoDBLoader:
         if item is None:
             return None
 
-        return self.decode(self.value_type(**{
-            key: value
-            for key, value in item.items()
-            if key not in ("name", "version")
-        }))
+        return self.decode(self._make_value(item))
+
+    def get_many(self, service, names, version=None):
+        """
+        Get many configuration values using batched reads.
+
+        :returns a dictionary of configuration values by name; missing names are omitted
+        :raises `RuntimeError` if some keys remain unprocessed after `BATCH_GET_ATTEMPTS` requests
+
+        """
+        names = list(set(names))
+        version = version or paddedInt(1)
+        table = table_name(self.prefix, service)
+
+        rows = []
+        for index in range(0, len(names), BATCH_GET_SIZE):
+            request_items = {
+                table: dict(
+                    Keys=[
+                        dict(name=name, version=version)
+                        for name in names[index:index + BATCH_GET_SIZE]
+                    ],
+                    ProjectionExpression=self._projection,
+                    ExpressionAttributeNames=self._attribute_names,
+                    ConsistentRead=self.consistent_read,
+                ),
+            }
+            # resend any keys that DynamoDB did not process (e.g. due to throttling), backing off
+            for attempt in range(BATCH_GET_ATTEMPTS):
+                if attempt:
+                    sleep(BATCH_GET_BACKOFF * 2 ** (attempt - 1))
+                result = self.dynamodb.batch_get_item(RequestItems=request_items)
+                rows.extend(result["Responses"].get(table, []))
+                request_items = result.get("UnprocessedKeys")
+                if not request_items:
+                    break
+            else:
+                raise RuntimeError(
+                    "Unable to get {} configuration value(s) from {} after {} attempts".format(
+                        len(request_items[table]["Keys"]),
+                        table,
+                        BATCH_GET_ATTEMPTS,
+                    ),
+                )
+
+        return dict(self.decode_items(
+            (row["name"], self._make_value(row))
+            for row in rows
+        ))
 
     def delete(self, service, name, version=None):
         """
@@ -187,9 +382,115 @@ class DynamoDBLoader:
                 version=version or paddedInt(1),
             ),
         )
+        self.refresh(service)
         return result
 
+    def _projection_expression(self):
+        """
+        Build the projection expression (and attribute names) for the row name and value fields.
+
+        """
+        # request all fields; since `key` is reserved, we have to use a substitution
+        field_names = [
+            "#k" if field == "key" else field
+            for field in self._value_fields
+        ]
+
+        attribute_names = {
+            "#n": "name",
+        }
+
+        if "#k" in field_names:
+            attribute_names["#k"] = "key"
+
+        return ", ".join(["#n"] + field_names), attribute_names
+
+    def _make_item(self, name, encoded_value, version=None):
+        """
+        Build a row from a name and value type; unset (`None`) value fields are omitted.
+
+        """
+        item = dict(
+            name=name,
+            version=version or paddedInt(1),
+        )
+        item.update(
+            (field, value)
+            for field, value in zip(self._value_fields, encoded_value)
+            if value is not None
+        )
+        return item
+
+    def _make_value(self, row):
+        """
+        Build the value type from a row's value fields.
+
+        Uses the namedtuple's `_make` over a `map` so that the per-row work stays in C.
+
+        """
+        return self.value_type._make(map(row.get, self._value_fields))
+
+    @property
+    def concurrency(self):
+        """
+        Return the maximum number of concurrent requests made by the loader.
+
+        """
+        return self.segments
+
+    @property
+    def client_config(self):
+        """
+        Return the botocore client config, pooling enough connections for concurrent requests.
+
+        Otherwise, connections beyond botocore's (default) pool size are discarded after use.
+
+        """
+        return Config(
+            max_pool_connections=max(self.concurrency, MAX_POOL_CONNECTIONS),
+            retries=dict(mode="adaptive"),
+        )
+
+    @property
+    def session(self):
+        """
+        Return the boto3 session, creating it on first use.
+
+        """
+        with self._lock:
+            if self._session is None:
+                self._session = Session(profile_name=self.profile_name)
+            return self._session
+
+    @property
+    def dynamodb(self):
+        """
+        Return the DynamoDB resource, creating it on first use.
+
+        """
+        with self._lock:
+            if self._dynamodb is None:
+                self._dynamodb = self.session.resource('dynamodb', region_name=self.region, config=self.client_config)
+            return self._dynamodb
+
+    @property
+    def client(self):
+        """
+        Return the (low-level, thread-safe) DynamoDB client, creating it on first use.
+
+        Unlike the resource's own client (`meta.client`), this client does not run the resource
+        layer's generic, shape-driven (de)serialization on every request.
+
+        """
+        with self._lock:
+            if self._client is None:
+                self._client = self.session.client('dynamodb', region_name=self.region, config=self.client_config)
+            return self._client
+
     def _table(self, service):
-        session = Session(profile_name=self.profile_name)
-        dynamodb = session.resource('dynamodb', region_name=self.region)
-        return dynamodb.Table(table_name(self.prefix, service))
+        with self._lock:
+            try:
+                return self._tables[service]
+            except KeyError:
+                table = self._tables[service] = self.dynamodb.Table(table_name(self.prefix, service))
+                return table
@@ -1,22 +1,161 @@
 """
 Encrypted DynamoDB config loader using credstash.
 
-Code adapted with much appreciation to credstash. As much as possible, uses credstash code,
-but currently prevented from full reuse because of difficulty configurating credstash's KMS key.
+Code adapted with much appreciation to credstash. Values are compatible with credstash's
+legacy AES-CTR format, but encryption is implemented here against `cryptography` (OpenSSL)
+so that AES and HMAC use hardware acceleration (e.g. AES-NI) where available.
 
 See: https://github.com/fugue/credstash/blob/master/credstash.py
 
 """
+from base64 import b64decode, b64encode
+from codecs import decode, encode
 from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
+from os import urandom
 
-from boto3 import Session
-from credstash import KeyService, open_aes_ctr_legacy, seal_aes_ctr_legacy
+from credstash import IntegrityError, KeyService
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives import hashes, hmac
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
 
 from microcosm_dynamodb.loaders.base import DynamoDBLoader
 
 
-# match credstash key names
-EncryptedValue = namedtuple("EncryptedValue", ["key", "contents", "hmac"])
+# match credstash key names; the nonce is only set for values sharing a data key
+EncryptedValue = namedtuple("EncryptedValue", ["key", "contents", "hmac", "nonce"], defaults=(None,))
+
+
+# credstash's legacy format uses a fixed AES-CTR nonce (and a new data key per value)
+LEGACY_NONCE = b"\x00" * 15 + b"\x01"
+
+
+# select the OpenSSL backend once; OpenSSL itself dispatches to AES-NI/SHA-NI at runtime
+# based on CPU capabilities, so no further detection is needed here
+BACKEND = default_backend()
+
+
+class DataKey:
+    """
+    An unwrapped KMS data key.
+
+    The first half of the key is used for AES, the second for HMAC. Both are prepared once
+    so that values sharing a data key do not repeat the AES and HMAC key setup.
+
+    """
+    def __init__(self, key):
+        half = len(key) // 2
+        self.algorithm = algorithms.AES(key[:half])
+        self.hmac = hmac.HMAC(key[half:], hashes.SHA256(), backend=BACKEND)
+
+    def aes_ctr(self, data, nonce=LEGACY_NONCE):
+        """
+        Encrypt or decrypt data using AES in CTR mode (the operations are identical).
+
+        OpenSSL processes the whole buffer in a single call (pipelining blocks with AES-NI
+        where available); in CTR mode, `finalize()` never produces additional output.
+
+        """
+        cipher = Cipher(
+            self.algorithm,
+            modes.CTR(nonce),
+            backend=BACKEND,
+        ).encryptor()
+        output = cipher.update(data)
+        cipher.finalize()
+        return output
+
+    def compute_hmac(self, ciphertext, nonce=None):
+        """
+        Compute the (raw) HMAC-SHA256 digest of a ciphertext (and its nonce, if any).
+
+        """
+        digest = self.hmac.copy()
+        if nonce is not None:
+            digest.update(nonce)
+        digest.update(ciphertext)
+        return digest.finalize()
+
+    def verify_hmac(self, ciphertext, expected_hmac, nonce=None):
+        """
+        Verify the (raw) HMAC-SHA256 digest of a ciphertext (and its nonce, if any) in constant time.
+
+        :raises `IntegrityError` if the HMAC does not match
+
+        """
+        digest = self.hmac.copy()
+        if nonce is not None:
+            digest.update(nonce)
+        digest.update(ciphertext)
+        try:
+            digest.verify(expected_hmac)
+        except InvalidSignature:
+            raise IntegrityError("Computed HMAC does not match stored HMAC")
+
+
+def to_bytes(value):
+    """
+    Read an attribute stored either as a base64-encoded string or as (DynamoDB) binary.
+
+    """
+    if isinstance(value, str):
+        return b64decode(value)
+    return getattr(value, "value", value)
+
+
+def seal_aes_ctr(data_key, wrapped_key, plaintext, nonce=None):
+    """
+    Encrypt a plaintext value using an (unwrapped) `DataKey`.
+
+    Without a nonce, produces credstash's legacy format, which is only safe if the data key
+    is never reused. With a nonce, the nonce is stored with the value and covered by its HMAC;
+    since such values are not credstash-compatible anyway, their contents are stored as binary
+    rather than base64.
+
+    """
+    if nonce is None:
+        ciphertext = data_key.aes_ctr(plaintext.encode("utf-8"))
+        contents = b64encode(ciphertext).decode("utf-8")
+    else:
+        contents = ciphertext = data_key.aes_ctr(plaintext.encode("utf-8"), nonce)
+
+    return EncryptedValue(
+        b64encode(wrapped_key).decode("utf-8"),
+        contents,
+        encode(data_key.compute_hmac(ciphertext, nonce), "hex_codec"),
+        nonce,
+    )
+
+
+def open_aes_ctr(data_key, value):
+    """
+    Decrypt an encrypted value using its (unwrapped) `DataKey`, verifying its HMAC first.
+
+    :raises `IntegrityError` if the HMAC does not match
+
+    """
+    ciphertext = to_bytes(value.contents)
+    nonce = to_bytes(value.nonce) if value.nonce else None
+
+    # credstash stores the hex digest as a string or as binary, depending on version
+    data_key.verify_hmac(ciphertext, decode(getattr(value.hmac, "value", value.hmac), "hex"), nonce)
+
+    return data_key.aes_ctr(ciphertext, nonce or LEGACY_NONCE).decode("utf-8")
+
+
+def open_batch(keys, values):
+    """
+    Decrypt a batch of encrypted values using already unwrapped data keys.
+
+    :param keys: a dictionary from wrapped key to `DataKey`
+
+    """
+    return [
+        open_aes_ctr(keys[value.key], value)
+        for value in values
+    ]
 
 
 class EncryptedDynamoDBLoader(DynamoDBLoader):
@@ -35,10 +174,23 @@ class EncryptedDynamoDBLoader(DynamoDBLoader):
         print loader(metadata)
         loader.delete(metadata.name, "key")
 
+    Values are written in credstash's format unless `share_data_keys` is enabled; values written
+    by `put_many` with shared data keys can be read by this loader, but not by credstash itself
+    (or by older versions of this loader).
+
     """
-    def __init__(self, kms_key, **kwargs):
+    def __init__(self, kms_key, max_workers=16, share_data_keys=False, **kwargs):
+        """
+        :param kms_key: the KMS key id (or alias) used to generate data keys
+        :param max_workers: the maximum number of concurrent KMS requests (and decryption batches)
+        :param share_data_keys: whether `put_many` encrypts all values with one data key (see `bulk_encrypt`)
+
+        """
         super(EncryptedDynamoDBLoader, self).__init__(**kwargs)
         self.kms_key = kms_key
+        self.max_workers = max_workers
+        self.share_data_keys = share_data_keys
+        self._kms = None
 
     @property
     def value_type(self):
@@ -50,33 +202,94 @@ class EncryptedDynamoDBLoader(DynamoDBLoader):
     def encode(self, value):
         return self.encrypt(value)
 
+    @property
+    def concurrency(self):
+        return max(self.max_workers, self.segments)
+
+    @property
+    def kms(self):
+        """
+        Return the KMS client, creating it on first use.
+
+        """
+        with self._lock:
+            if self._kms is None:
+                self._kms = self.session.client('kms', region_name=self.region, config=self.client_config)
+            return self._kms
+
+    def decode_items(self, values):
+        """
+        Decrypt (name, encrypted value) pairs into items.
+
+        Unwraps each distinct data key with a single (concurrent) KMS request instead of
+        making one request per row, then verifies and decrypts rows in one batch per worker.
+
+        """
+        values = list(values)
+        if not values:
+            return []
+
+        # transpose once so that batches carry only the encrypted values
+        names, values = zip(*values)
+
+        batch_size = -(-len(values) // self.max_workers)
+        batches = [
+            values[index:index + batch_size]
+            for index in range(0, len(values), batch_size)
+        ]
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            keys = self.unwrap_keys((value.key for value in values), executor)
+            plaintexts = chain.from_iterable(
+                executor.map(lambda batch: open_batch(keys, batch), batches),
+            )
+            return list(zip(names, plaintexts))
+
+    def unwrap_keys(self, wrapped_keys, executor, context=None):
+        """
+        Concurrently decrypt (base64-encoded) wrapped data keys using KMS.
+
+        :returns a dictionary from wrapped key to `DataKey`
+
+        """
+        key_service = KeyService(self.kms, self.kms_key, context or {})
+        wrapped_keys = list(set(wrapped_keys))
+        keys = executor.map(
+            lambda wrapped_key: DataKey(key_service.decrypt(b64decode(wrapped_key))),
+            wrapped_keys,
+        )
+        return dict(zip(wrapped_keys, keys))
+
     def decrypt(self, value, context=None):
         if not context:
             context = {}
-        session = Session(profile_name=self.profile_name)
-        kms = session.client('kms', region_name=self.region)
-        key_service = KeyService(kms, self.kms_key, context)
-        return open_aes_ctr_legacy(
-            key_service,
-            dict(
-                key=value.key,
-                contents=value.contents,
-                hmac=value.hmac,
-            )
-        )
+        key_service = KeyService(self.kms, self.kms_key, context)
+        return open_aes_ctr(DataKey(key_service.decrypt(b64decode(value.key))), value)
 
     def encrypt(self, plaintext, context=None):
         if not context:
             context = {}
-        session = Session(profile_name=self.profile_name)
-        kms = session.client('kms', region_name=self.region)
-        key_service = KeyService(kms, self.kms_key, context)
-        sealed = seal_aes_ctr_legacy(
-            key_service,
-            plaintext,
-        )
-        return EncryptedValue(
-            sealed["key"],
-            sealed["contents"],
-            sealed["hmac"],
-        )
+        key_service = KeyService(self.kms, self.kms_key, context)
+        key, wrapped_key = key_service.generate_key_data(64)
+        return seal_aes_ctr(DataKey(key), wrapped_key, plaintext)
+
+    def encode_many(self, values):
+        if not self.share_data_keys:
+            return super(EncryptedDynamoDBLoader, self).encode_many(values)
+        return self.bulk_encrypt(values)
+
+    def bulk_encrypt(self, plaintexts, context=None):
+        """
+        Encrypt many plaintext values using a single KMS data key.
+
+        Each value uses its own random nonce, so values encrypted this way are not readable
+        by credstash itself.
+
+        """
+        key_service = KeyService(self.kms, self.kms_key, context or {})
+        key, wrapped_key = key_service.generate_key_data(64)
+        data_key = DataKey(key)
+        return [
+            seal_aes_ctr(data_key, wrapped_key, plaintext, nonce=urandom(16))
+            for plaintext in plaintexts
+        ]
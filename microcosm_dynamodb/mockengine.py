@@ -75,7 +75,8 @@ class MockEngine:
         self.models.setdefault(model, {})
 
     def delete_schema(self):
-        pass
+        for model in self.models:
+            self.models[model] = {}
 
     def create_schema(self):
         pass
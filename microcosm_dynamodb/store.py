@@ -212,12 +212,14 @@ class Store:
         """
         Construct a query for the model.
 
+        Queries are mutable (filters accumulate), so a new query is built for each call;
+        filtering is skipped entirely when there are no criteria.
+
         """
-        return self.engine.query(
-            self.model_class
-        ).filter(
-            *criterion
-        )
+        query = self.engine.query(self.model_class)
+        if criterion:
+            query = query.filter(*criterion)
+        return query
 
     def new_object_id(self):
         """
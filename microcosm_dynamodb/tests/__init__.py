@@ -0,0 +1,10 @@
+"""
+Test setup.
+
+"""
+from os import environ
+
+
+# skip the (slow) EC2 instance metadata lookup when botocore resolves credentials
+environ.setdefault("AWS_EC2_METADATA_DISABLED", "true")
+environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
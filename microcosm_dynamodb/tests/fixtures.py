@@ -0,0 +1,18 @@
+"""
+Shared test fixtures.
+
+"""
+from functools import lru_cache
+
+from microcosm.api import create_object_graph
+
+
+@lru_cache(maxsize=None)
+def cached_graph(name="example", testing=True, import_name="microcosm_dynamodb"):
+    """
+    Create an object graph at most once per set of arguments, sharing it across test modules.
+
+    Tests using a shared graph must reset any state they rely on (e.g. using `recreate_all`).
+
+    """
+    return create_object_graph(name=name, testing=testing, import_name=import_name)
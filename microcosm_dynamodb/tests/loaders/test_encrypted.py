@@ -0,0 +1,184 @@
+"""
+Test encryption logic (without any KMS) integration.
+
+"""
+from base64 import b64decode
+from os import urandom
+from unittest.mock import MagicMock, patch
+
+from boto3.dynamodb.types import Binary, TypeSerializer
+from credstash import IntegrityError, open_aes_ctr_legacy
+from hamcrest import (
+    assert_that,
+    calling,
+    equal_to,
+    is_,
+    is_not,
+    raises,
+)
+from microcosm.metadata import Metadata
+
+from microcosm_dynamodb.loaders.encrypted import (
+    DataKey,
+    EncryptedDynamoDBLoader,
+    open_aes_ctr,
+    seal_aes_ctr,
+)
+
+
+class DummyKeyService:
+    """
+    Stand-in for credstash's `KeyService` that "wraps" data keys by reversing them.
+
+    """
+    def generate_key_data(self, number_of_bytes):
+        key = urandom(number_of_bytes)
+        return key, key[::-1]
+
+    def decrypt(self, encoded_key):
+        return encoded_key[::-1]
+
+
+def seal(key_service, plaintext, nonce=None):
+    key, wrapped_key = key_service.generate_key_data(64)
+    return seal_aes_ctr(DataKey(key), wrapped_key, plaintext, nonce)
+
+
+class TestEncryption:
+
+    def setup(self):
+        self.key_service = DummyKeyService()
+
+    def unwrap(self, value):
+        return DataKey(self.key_service.decrypt(b64decode(value.key)))
+
+    def test_seal_and_open(self):
+        value = seal(self.key_service, "plaintext")
+
+        assert_that(value.contents, is_not(equal_to("plaintext")))
+        assert_that(open_aes_ctr(self.unwrap(value), value), is_(equal_to("plaintext")))
+
+    def test_credstash_compatible(self):
+        value = seal(self.key_service, "plaintext")
+
+        assert_that(
+            open_aes_ctr_legacy(self.key_service, value._asdict()),
+            is_(equal_to("plaintext")),
+        )
+
+    def test_seal_and_open_with_nonce(self):
+        value = seal(self.key_service, "plaintext", nonce=urandom(16))
+        # as read back from DynamoDB
+        stored = value._replace(contents=Binary(value.contents), nonce=Binary(value.nonce))
+
+        assert_that(open_aes_ctr(self.unwrap(value), stored), is_(equal_to("plaintext")))
+
+    def test_open_tampered_nonce(self):
+        value = seal(self.key_service, "plaintext", nonce=urandom(16))
+        other = seal(self.key_service, "plaintext", nonce=urandom(16))
+
+        assert_that(
+            calling(open_aes_ctr).with_args(self.unwrap(value), value._replace(nonce=other.nonce)),
+            raises(IntegrityError),
+        )
+
+    def test_open_tampered(self):
+        value = seal(self.key_service, "plaintext")
+        other = seal(self.key_service, "other")
+
+        assert_that(
+            calling(open_aes_ctr).with_args(self.unwrap(value), value._replace(contents=other.contents)),
+            raises(IntegrityError),
+        )
+
+
+class TestEncryptedDynamoDBLoader:
+
+    def setup(self):
+        self.key_service = DummyKeyService()
+        self.loader = EncryptedDynamoDBLoader(kms_key="alias/dummy")
+        self.loader._kms = MagicMock()
+        self.loader._kms.decrypt.side_effect = lambda CiphertextBlob, EncryptionContext: dict(
+            Plaintext=self.key_service.decrypt(CiphertextBlob),
+        )
+        self.metadata = Metadata("dummy")
+
+    def item(self, name, value):
+        """
+        Build a row as returned by the (low-level client) scan.
+
+        """
+        serialize = TypeSerializer().serialize
+        item = dict(name=name, version="0000000000000000001", **value._asdict())
+        return {
+            key: serialize(value)
+            for key, value in item.items()
+            if value is not None
+        }
+
+    def test_load_configuration(self):
+        foo = seal(self.key_service, "foo")
+        bar = seal(self.key_service, "bar")
+
+        with patch.object(self.loader, "_client") as mocked:
+            mocked.scan.return_value = dict(
+                Items=[
+                    self.item("foo", foo),
+                    self.item("bar__baz", bar),
+                    self.item("bar__qux", bar),
+                ],
+            )
+
+            assert_that(self.loader(self.metadata), is_(equal_to(dict(
+                foo="foo",
+                bar=dict(
+                    baz="bar",
+                    qux="bar",
+                ),
+            ))))
+
+        # one KMS request per distinct data key
+        assert_that(self.loader.kms.decrypt.call_count, is_(equal_to(2)))
+
+    def test_kms_pools_connections_for_workers(self):
+        loader = EncryptedDynamoDBLoader(kms_key="alias/dummy", max_workers=32, region="us-east-1")
+
+        assert_that(loader.kms.meta.config.max_pool_connections, is_(equal_to(32)))
+        assert_that(loader.client.meta.config.max_pool_connections, is_(equal_to(32)))
+
+    def generate_data_keys(self):
+        self.loader._kms.generate_data_key.side_effect = lambda KeyId, EncryptionContext, NumberOfBytes: dict(
+            zip(("Plaintext", "CiphertextBlob"), self.key_service.generate_key_data(NumberOfBytes)),
+        )
+
+    def test_encode_many(self):
+        self.generate_data_keys()
+
+        values = self.loader.encode_many(["foo", "bar"])
+
+        # credstash-compatible by default: one data key per value, no nonce
+        assert_that(self.loader.kms.generate_data_key.call_count, is_(equal_to(2)))
+        assert_that([value.nonce for value in values], is_(equal_to([None, None])))
+
+    def test_encode_many_sharing_data_keys(self):
+        self.loader.share_data_keys = True
+        self.generate_data_keys()
+
+        values = self.loader.encode_many(["foo", "bar"])
+
+        assert_that(self.loader.kms.generate_data_key.call_count, is_(equal_to(1)))
+        assert_that(values[0].key, is_(equal_to(values[1].key)))
+
+    def test_bulk_encrypt(self):
+        self.generate_data_keys()
+
+        values = self.loader.bulk_encrypt(["foo", "bar"])
+
+        # one KMS request for all values, with distinct nonces
+        assert_that(self.loader.kms.generate_data_key.call_count, is_(equal_to(1)))
+        assert_that(values[0].key, is_(equal_to(values[1].key)))
+        assert_that(values[0].nonce, is_not(equal_to(values[1].nonce)))
+        assert_that(
+            dict(self.loader.decode_items(zip(["foo", "bar"], values))),
+            is_(equal_to(dict(foo="foo", bar="bar"))),
+        )
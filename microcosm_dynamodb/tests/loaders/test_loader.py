@@ -2,17 +2,23 @@
 Test basic loading logic (without any DynamoDB) integration.
 
 """
+from asyncio import gather, new_event_loop
 from collections import namedtuple
+from time import sleep
+from unittest.mock import ANY, MagicMock, call, patch
 
 from microcosm.metadata import Metadata
 from hamcrest import (
     assert_that,
+    calling,
     equal_to,
     is_,
+    raises,
 )
-from mock import patch
 
-from microcosm_dynamodb.loaders.base import DynamoDBLoader
+from boto3.dynamodb.types import TypeSerializer
+
+from microcosm_dynamodb.loaders.base import BATCH_GET_ATTEMPTS, BATCH_GET_BACKOFF, DynamoDBLoader
 
 
 DummyValue = namedtuple("TestValue", "dummy")
@@ -38,6 +44,21 @@ MOCK_ITEMS = [
 ]
 
 
+def scanned(*items, **kwargs):
+    """
+    Build a (low-level client) scan response.
+
+    """
+    serialize = TypeSerializer().serialize
+    return dict(
+        Items=[
+            {name: serialize(value) for name, value in item.items()}
+            for item in items
+        ],
+        **kwargs
+    )
+
+
 class DummyDynamoDBLoader(DynamoDBLoader):
 
     @property
@@ -58,21 +79,22 @@ class TestDynamoDBLoader:
         self.metadata = Metadata("dummy")
 
     def test_load_empty_configuration(self):
-        with patch.object(self.loader, "_table") as mocked:
-            mocked.return_value.scan.return_value = dict(
-                Items=[],
-            )
+        with patch.object(self.loader, "_client") as mocked:
+            mocked.scan.return_value = scanned()
 
             assert_that(self.loader(self.metadata), is_(equal_to(dict())))
 
-        mocked.assert_called_with(self.metadata.name)
-        mocked.return_value.scan.assert_called()
+        mocked.scan.assert_called_with(
+            TableName="{}-dummy-config".format(self.loader.prefix),
+            Select="SPECIFIC_ATTRIBUTES",
+            ProjectionExpression="#n, dummy",
+            ExpressionAttributeNames={"#n": "name"},
+            ConsistentRead=False,
+        )
 
     def test_load_non_empty_configuration(self):
-        with patch.object(self.loader, "_table") as mocked:
-            mocked.return_value.scan.return_value = dict(
-                Items=MOCK_ITEMS,
-            )
+        with patch.object(self.loader, "_client") as mocked:
+            mocked.scan.return_value = scanned(*MOCK_ITEMS)
 
             assert_that(self.loader(self.metadata), is_(equal_to(dict(
                 foo="bar",
@@ -81,8 +103,121 @@ class TestDynamoDBLoader:
                 ),
             ))))
 
-        mocked.assert_called_with(self.metadata.name)
-        mocked.return_value.scan.assert_called()
+        mocked.scan.assert_called()
+
+    def test_load_configuration_async(self):
+        loop = new_event_loop()
+
+        with patch.object(self.loader, "_client") as mocked:
+            mocked.scan.return_value = scanned(*MOCK_ITEMS)
+
+            try:
+                config = loop.run_until_complete(self.loader.acall(self.metadata))
+            finally:
+                loop.close()
+
+        assert_that(config, is_(equal_to(dict(
+            foo="bar",
+            bar=dict(
+                baz="foo",
+            ),
+        ))))
+
+    def test_load_paginated_configuration(self):
+        with patch.object(self.loader, "_client") as mocked:
+            mocked.scan.side_effect = [
+                scanned(SIMPLE_ITEM, LastEvaluatedKey=dict(name="foo")),
+                scanned(NESTED_ITEM),
+            ]
+
+            assert_that(self.loader(self.metadata), is_(equal_to(dict(
+                foo="bar",
+                bar=dict(
+                    baz="foo",
+                ),
+            ))))
+
+        assert_that(mocked.scan.call_count, is_(equal_to(2)))
+        assert_that(
+            mocked.scan.call_args[1]["ExclusiveStartKey"],
+            is_(equal_to(dict(name="foo"))),
+        )
+
+    def test_load_cached_configuration(self):
+        with patch.object(self.loader, "_client") as mocked:
+            mocked.scan.return_value = scanned(*MOCK_ITEMS)
+
+            config = self.loader(self.metadata)
+            assert_that(self.loader(self.metadata), is_(equal_to(config)))
+            assert_that(mocked.scan.call_count, is_(equal_to(1)))
+
+            self.loader.refresh(self.metadata.name)
+            assert_that(self.loader(self.metadata), is_(equal_to(config)))
+            assert_that(mocked.scan.call_count, is_(equal_to(2)))
+
+    def test_load_segmented_configuration(self):
+        self.loader.segments = 2
+
+        with patch.object(self.loader, "_client") as mocked:
+            mocked.scan.side_effect = [
+                scanned(SIMPLE_ITEM),
+                scanned(NESTED_ITEM),
+            ]
+
+            assert_that(self.loader(self.metadata), is_(equal_to(dict(
+                foo="bar",
+                bar=dict(
+                    baz="foo",
+                ),
+            ))))
+
+        assert_that(mocked.scan.call_count, is_(equal_to(2)))
+
+    def test_segmented_scan_creates_one_client(self):
+        self.loader.segments = 8
+
+        client = MagicMock()
+        client.scan.return_value = scanned()
+
+        def create_client(*args, **kwargs):
+            # slow enough for concurrent segments to race on creating the client
+            sleep(0.01)
+            return client
+
+        with patch("microcosm_dynamodb.loaders.base.Session") as mocked:
+            mocked.return_value.client.side_effect = create_client
+            self.loader(self.metadata)
+
+        mocked.return_value.client.assert_called_once_with("dynamodb", region_name=None, config=ANY)
+        assert_that(client.scan.call_count, is_(equal_to(8)))
+
+    def test_concurrent_async_loads_create_one_client(self):
+        client = MagicMock()
+        client.scan.return_value = scanned()
+
+        def create_client(*args, **kwargs):
+            # slow enough for concurrent loads to race on creating the client
+            sleep(0.01)
+            return client
+
+        async def load_concurrently():
+            return await gather(
+                self.loader.acall(self.metadata),
+                self.loader.acall(self.metadata, version="0000000000000000002"),
+            )
+
+        loop = new_event_loop()
+
+        with patch("microcosm_dynamodb.loaders.base.Session") as mocked:
+            mocked.return_value.client.side_effect = create_client
+            try:
+                loop.run_until_complete(load_concurrently())
+            finally:
+                loop.close()
+
+        mocked.assert_called_once_with(profile_name=None)
+        mocked.return_value.client.assert_called_once_with("dynamodb", region_name=None, config=ANY)
+        assert_that(client.scan.call_count, is_(equal_to(2)))
 
     def test_put(self):
         with patch.object(self.loader, "_table") as mocked:
@@ -112,6 +247,76 @@ class TestDynamoDBLoader:
             ),
         )
 
+    def test_put_many(self):
+        with patch.object(self.loader, "_table") as mocked:
+            self.loader.put_many(self.metadata.name, [("foo", "bar"), ("bar__baz", "foo")])
+
+        batch = mocked.return_value.batch_writer.return_value.__enter__.return_value
+        batch.put_item.assert_has_calls([
+            call(Item=SIMPLE_ITEM),
+            call(Item=NESTED_ITEM),
+        ])
+
+    def unprocessed(self, *names):
+        """
+        Build the (unprocessed) request items for some names, as returned by BatchGetItem.
+
+        """
+        return {
+            "{}-dummy-config".format(self.loader.prefix): dict(
+                Keys=[dict(name=name, version="0000000000000000001") for name in names],
+                ProjectionExpression="#n, dummy",
+                ExpressionAttributeNames={"#n": "name"},
+                ConsistentRead=False,
+            ),
+        }
+
+    def test_get_many(self):
+        table = "{}-dummy-config".format(self.loader.prefix)
+        self.loader._dynamodb = MagicMock()
+        self.loader._dynamodb.batch_get_item.side_effect = [
+            dict(
+                Responses={table: [SIMPLE_ITEM]},
+                UnprocessedKeys=self.unprocessed("bar__baz"),
+            ),
+            dict(
+                Responses={table: [NESTED_ITEM]},
+                UnprocessedKeys={},
+            ),
+        ]
+
+        with patch("microcosm_dynamodb.loaders.base.sleep") as mocked_sleep:
+            assert_that(
+                self.loader.get_many(self.metadata.name, ["foo", "bar__baz", "missing"]),
+                is_(equal_to({
+                    "foo": "bar",
+                    "bar__baz": "foo",
+                })),
+            )
+
+        assert_that(self.loader._dynamodb.batch_get_item.call_count, is_(equal_to(2)))
+        self.loader._dynamodb.batch_get_item.assert_called_with(RequestItems=self.unprocessed("bar__baz"))
+        mocked_sleep.assert_called_once_with(BATCH_GET_BACKOFF)
+
+    def test_get_many_unprocessed(self):
+        self.loader._dynamodb = MagicMock()
+        self.loader._dynamodb.batch_get_item.return_value = dict(
+            Responses={},
+            UnprocessedKeys=self.unprocessed("foo"),
+        )
+
+        with patch("microcosm_dynamodb.loaders.base.sleep") as mocked_sleep:
+            assert_that(
+                calling(self.loader.get_many).with_args(self.metadata.name, ["foo"]),
+                raises(RuntimeError),
+            )
+
+        assert_that(self.loader._dynamodb.batch_get_item.call_count, is_(equal_to(BATCH_GET_ATTEMPTS)))
+        mocked_sleep.assert_has_calls([
+            call(BATCH_GET_BACKOFF * 2 ** attempt)
+            for attempt in range(BATCH_GET_ATTEMPTS - 1)
+        ])
+
     def test_delete(self):
         with patch.object(self.loader, "_table") as mocked:
             self.loader.delete(self.metadata.name, "foo")
@@ -123,3 +328,19 @@ class TestDynamoDBLoader:
                 version="0000000000000000001",
             ),
         )
+
+    def test_table_is_cached(self):
+        with patch("microcosm_dynamodb.loaders.base.Session") as mocked:
+            table = self.loader._table(self.metadata.name)
+            assert_that(self.loader._table(self.metadata.name), is_(table))
+
+        mocked.assert_called_once_with(profile_name=None)
+        mocked.return_value.resource.assert_called_once_with("dynamodb", region_name=None, config=ANY)
+
+    def test_client_pools_connections_for_segments(self):
+        loader = DummyDynamoDBLoader(region="us-east-1", segments=16)
+
+        config = loader.client.meta.config
+        assert_that(config.max_pool_connections, is_(equal_to(16)))
+        assert_that(config.retries, is_(equal_to(dict(mode="adaptive"))))
+        assert_that(self.loader.client_config.max_pool_connections, is_(equal_to(10)))
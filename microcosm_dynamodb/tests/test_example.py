@@ -12,25 +12,27 @@ from hamcrest import (
 )
 from nose.plugins.attrib import attr
 
-from microcosm.api import create_object_graph
 from microcosm_dynamodb.errors import ModelNotFoundError
 from microcosm_dynamodb.operations import recreate_all
 from microcosm_dynamodb.tests.example import Company
+from microcosm_dynamodb.tests.fixtures import cached_graph
 
 
 @attr('aws')
 class TestCompany:
 
-    def setup(self):
-        self.graph = create_object_graph(
-            name="example",
+    @classmethod
+    def setup_class(cls):
+        # building the graph is comparatively expensive; share it across tests (and modules)
+        # and isolate tests by recreating tables instead
+        cls.graph = cached_graph(
             # NB: testing will use the MockEngine; toggle to test against a real DynamoDB, but
             # be forewarned that recreating tables will be very slow.
             testing=True,
-            import_name="microcosm_dynamodb",
         )
-        self.company_store = self.graph.company_store
+        cls.company_store = cls.graph.company_store
 
+    def setup(self):
         recreate_all(self.graph)
 
     def test_create_retrieve_company(self):
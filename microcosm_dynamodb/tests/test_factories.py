@@ -2,21 +2,121 @@
 Factory tests.
 
 """
-from flywheel import Engine
-from hamcrest import (
-    assert_that,
-    instance_of,
-    is_,
-)
+from sys import modules
+from unittest.mock import MagicMock, patch
+
+from nose.plugins.attrib import attr
 
 from microcosm.api import create_object_graph
+from microcosm.loaders import load_from_dict
+from microcosm_dynamodb.mockengine import MockEngine
+from microcosm_dynamodb.tests.fixtures import cached_graph
 
 
+@attr('aws')
 def test_configure_flywheel_engine():
     """
     Should create the `flywheel` engine
 
     """
+    # flywheel (and boto3) are only needed for the real engine; import lazily
+    from flywheel import Engine
+
     # don't enable testing because we want a non-mock engine
-    graph = create_object_graph(name="example", import_name="microcosm_dynamodb")
-    assert_that(graph.dynamodb, is_(instance_of(Engine)))
+    graph = cached_graph(testing=False)
+    assert isinstance(graph.dynamodb, Engine), graph.dynamodb
+
+
+def test_configure_flywheel_engine_client_config():
+    """
+    Should configure the engine's client from (typed) config
+
+    """
+    # values loaded from the environment are strings
+    loader = load_from_dict(dynamodb=dict(
+        max_pool_connections="50",
+        region="us-east-1",
+        tcp_keepalive="false",
+    ))
+    graph = create_object_graph(name="example", import_name="microcosm_dynamodb", loader=loader)
+    config = graph.dynamodb.dynamo.client.meta.config
+    assert config.max_pool_connections == 50
+    assert config.retries == {"mode": "adaptive"}
+    assert not config.tcp_keepalive
+
+
+def test_configure_flywheel_engine_for_host():
+    """
+    Should create the `flywheel` engine against a specific host
+
+    """
+    from flywheel import Engine
+
+    loader = load_from_dict(dynamodb=dict(host="localhost", region="us-east-1"))
+    graph = create_object_graph(name="example", import_name="microcosm_dynamodb", loader=loader)
+    assert isinstance(graph.dynamodb, Engine), graph.dynamodb
+    assert graph.dynamodb.dynamo.client.meta.endpoint_url == "http://localhost:8000"
+
+
+def test_configure_flywheel_engine_for_secure_host():
+    """
+    Should create the `flywheel` engine against a specific host over HTTPS
+
+    """
+    loader = load_from_dict(dynamodb=dict(
+        host="dynamodb.example.com",
+        is_secure="true",
+        port="443",
+        region="us-east-1",
+    ))
+    graph = create_object_graph(name="example", import_name="microcosm_dynamodb", loader=loader)
+    assert graph.dynamodb.dynamo.client.meta.endpoint_url == "https://dynamodb.example.com:443"
+    assert graph.dynamodb_resource.meta.client.meta.endpoint_url == "https://dynamodb.example.com:443"
+
+
+def test_configure_dynamodb_resource():
+    """
+    Should create a `boto3` resource with the engine's client configuration
+
+    """
+    loader = load_from_dict(dynamodb=dict(
+        host="localhost",
+        max_pool_connections="50",
+        port="8001",
+        region="us-east-1",
+    ))
+    graph = create_object_graph(name="example", import_name="microcosm_dynamodb", loader=loader)
+    client = graph.dynamodb_resource.meta.client
+    assert client.meta.endpoint_url == "http://localhost:8001"
+    assert client.meta.config.max_pool_connections == 50
+    assert client.meta.config.retries == {"mode": "adaptive"}
+
+
+def test_configure_dynamodb_resource_for_dax():
+    """
+    Should create the resource using `amazondax` when a DAX endpoint is configured
+
+    """
+    amazondax = MagicMock()
+    loader = load_from_dict(dynamodb=dict(
+        dax_endpoint="dax://example.dax-clusters.us-east-1.amazonaws.com",
+        region="us-east-1",
+    ))
+    graph = create_object_graph(name="example", import_name="microcosm_dynamodb", loader=loader)
+
+    with patch.dict(modules, amazondax=amazondax):
+        assert graph.dynamodb_resource is amazondax.AmazonDaxClient.resource.return_value
+
+    amazondax.AmazonDaxClient.resource.assert_called_once_with(
+        endpoint_url="dax://example.dax-clusters.us-east-1.amazonaws.com",
+        region_name="us-east-1",
+    )
+
+
+def test_configure_mock_engine():
+    """
+    Should create the in-memory `MockEngine` when testing
+
+    """
+    graph = cached_graph()
+    assert isinstance(graph.dynamodb, MockEngine), graph.dynamodb